@@ -4,20 +4,17 @@ SessionStart hook - validates TOML task spec and provides ready tasks with workt
 """
 from __future__ import annotations
 
+import hashlib
 import json
-import subprocess
+import os
 import sys
 from dataclasses import dataclass, field
+from graphlib import CycleError, TopologicalSorter
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, ClassVar, Optional
 
-try:
-    import tomllib
-except ImportError:
-    import tomli as tomllib  # Python < 3.11
 
-
-@dataclass
+@dataclass(slots=True)
 class Project:
     """Project metadata."""
     name: str
@@ -25,9 +22,11 @@ class Project:
     worktree_base: str = ".worktrees"
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """Task definition with validation."""
+    VALID_STATUSES: ClassVar[frozenset[str]] = frozenset({"pending", "in_progress", "complete"})
+
     id: str
     title: str
     acceptance: str
@@ -43,13 +42,17 @@ class Task:
             raise ValueError(f"Task {self.id} must have a title")
         if not self.acceptance:
             raise ValueError(f"Task {self.id} must have acceptance criteria")
-        if self.status not in ("pending", "in_progress", "complete"):
+        if not isinstance(self.status, str) or self.status not in self.VALID_STATUSES:
             raise ValueError(f"Task {self.id} has invalid status: {self.status}")
 
 
-@dataclass
+@dataclass(slots=True)
 class TaskSpec:
     """Full task specification schema."""
+    VALID_STATUSES: ClassVar[frozenset[str]] = frozenset(
+        {"draft", "needs_review", "ready_for_implementation"}
+    )
+
     version: int
     status: str
     project: Project
@@ -58,42 +61,97 @@ class TaskSpec:
     def __post_init__(self) -> None:
         if self.version != 1:
             raise ValueError(f"Unsupported spec version: {self.version}")
-        if self.status not in ("draft", "needs_review", "ready_for_implementation"):
+        if not isinstance(self.status, str) or self.status not in self.VALID_STATUSES:
             raise ValueError(f"Invalid spec status: {self.status}")
 
-        # Validate all task deps reference existing tasks
-        task_ids = {t.id for t in self.tasks}
+        # Validate task ids are unique and all deps reference existing tasks
+        task_ids: set[str] = set()
+        for task in self.tasks:
+            if task.id in task_ids:
+                raise ValueError(f"Duplicate task id: {task.id}")
+            task_ids.add(task.id)
         for task in self.tasks:
             for dep in task.deps:
                 if dep not in task_ids:
                     raise ValueError(f"Task {task.id} depends on unknown task: {dep}")
 
 
+# Hook payloads are a few KB; anything past this is treated as malformed
+MAX_INPUT_BYTES = 1 << 20
+
+
 def load_input() -> dict[str, Any]:
-    """Load hook input from stdin."""
+    """Load hook input from stdin with a single bounded read."""
+    raw = sys.stdin.buffer.read(MAX_INPUT_BYTES + 1)
+    if len(raw) > MAX_INPUT_BYTES:
+        return {}
     try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
+        return json.loads(raw)
+    except ValueError:  # JSONDecodeError or undecodable bytes
         return {}
 
 
 def block(reason: str) -> None:
     """Output block decision and exit."""
-    print(json.dumps({"decision": "block", "reason": reason}))
+    print(json.dumps({"decision": "block", "reason": reason}, separators=(",", ":")))
     sys.exit(0)
 
 
 def allow(reason: str = "") -> None:
     """Output allow decision and exit."""
-    print(json.dumps({"decision": "allow", "reason": reason}))
+    print(json.dumps({"decision": "allow", "reason": reason}, separators=(",", ":")))
     sys.exit(0)
 
 
-def parse_spec(toml_path: Path) -> TaskSpec:
-    """Parse and validate TOML spec into dataclasses."""
+def cache_path_for(toml_path: Path) -> Path:
+    """Get the JSON cache path for a parsed TOML file.
+
+    Lives in the user cache dir, keyed on the absolute spec path, so the hook
+    never leaves untracked files in the project working tree.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    digest = hashlib.sha256(os.path.abspath(toml_path).encode()).hexdigest()[:32]
+    return Path(cache_home) / "swiss-cheese" / f"{digest}.json"
+
+
+def load_toml_cached(toml_path: Path) -> dict[str, Any]:
+    """Load TOML data, reusing the JSON cache while the file is unchanged."""
+    st = toml_path.stat()
+    key = [st.st_mtime_ns, st.st_size]
+    cache_path = cache_path_for(toml_path)
+
+    try:
+        cached = json.loads(cache_path.read_bytes())
+        if cached["key"] == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    # Deferred so the no-spec path never pays for the TOML parser import
+    try:
+        import tomllib
+    except ImportError:
+        import tomli as tomllib  # Python < 3.11
+
     with open(toml_path, "rb") as f:
         data = tomllib.load(f)
 
+    # Best effort - TOML values like datetimes are not JSON-serializable
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"key": key, "data": data}, separators=(",", ":")))
+        os.replace(tmp_path, cache_path)
+    except (OSError, TypeError, ValueError):
+        pass
+
+    return data
+
+
+def parse_spec(toml_path: Path) -> TaskSpec:
+    """Parse and validate TOML spec into dataclasses."""
+    data = load_toml_cached(toml_path)
+
     project_data = data.get("project", {})
     project = Project(
         name=project_data.get("name", ""),
@@ -122,51 +180,54 @@ def parse_spec(toml_path: Path) -> TaskSpec:
 
 
 def topological_sort(tasks: list[Task]) -> list[Task]:
-    """Kahn's algorithm for topological sort. Returns tasks in dependency order."""
-    # Build adjacency and in-degree
+    """Sort tasks in dependency order. Raises ValueError on dependency cycles."""
     task_map = {t.id: t for t in tasks}
-    in_degree: dict[str, int] = {t.id: 0 for t in tasks}
-    dependents: dict[str, list[str]] = {t.id: [] for t in tasks}
+    sorter: TopologicalSorter[str] = TopologicalSorter()
 
+    # Register every task first so independent tasks keep tasks.toml order
     for task in tasks:
-        for dep in task.deps:
-            if dep in task_map:
-                dependents[dep].append(task.id)
-                in_degree[task.id] += 1
+        sorter.add(task.id)
+    for task in tasks:
+        sorter.add(task.id, *(dep for dep in task.deps if dep in task_map))
 
-    # Start with nodes that have no dependencies
-    queue = [tid for tid, deg in in_degree.items() if deg == 0]
-    sorted_ids: list[str] = []
+    try:
+        sorted_ids = list(sorter.static_order())
+    except CycleError as e:
+        raise ValueError(f"Dependency cycle detected involving: {e.args[1]}") from None
 
-    while queue:
-        current = queue.pop(0)
-        sorted_ids.append(current)
+    return [task_map[tid] for tid in sorted_ids]
 
-        for dependent in dependents[current]:
-            in_degree[dependent] -= 1
-            if in_degree[dependent] == 0:
-                queue.append(dependent)
 
-    # Check for cycle
-    if len(sorted_ids) != len(tasks):
-        cycle_tasks = [tid for tid in in_degree if in_degree[tid] > 0]
-        raise ValueError(f"Dependency cycle detected involving: {cycle_tasks}")
+def partition_tasks(tasks: list[Task]) -> tuple[list[Task], list[Task], set[str]]:
+    """Split tasks by status in one pass. Returns (pending, in_progress, complete_ids)."""
+    pending: list[Task] = []
+    in_progress: list[Task] = []
+    complete_ids: set[str] = set()
 
-    return [task_map[tid] for tid in sorted_ids]
+    for task in tasks:
+        if task.status == "pending":
+            pending.append(task)
+        elif task.status == "in_progress":
+            in_progress.append(task)
+        else:
+            complete_ids.add(task.id)
 
+    return pending, in_progress, complete_ids
 
-def get_ready_tasks(tasks: list[Task]) -> list[Task]:
-    """Return pending tasks whose dependencies are all complete."""
-    complete_ids = {t.id for t in tasks if t.status == "complete"}
 
-    ready = []
-    for task in tasks:
-        if task.status != "pending":
-            continue
-        if all(dep in complete_ids for dep in task.deps):
-            ready.append(task)
+def get_ready_tasks(tasks: list[Task], complete_ids: Optional[set[str]] = None) -> list[Task]:
+    """Return pending tasks whose dependencies are all complete.
 
-    return ready
+    Pass complete_ids when already known (see partition_tasks) to skip rescanning.
+    """
+    if complete_ids is None:
+        complete_ids = {t.id for t in tasks if t.status == "complete"}
+
+    return [
+        task for task in tasks
+        if task.status == "pending"
+        and (not task.deps or complete_ids.issuperset(task.deps))
+    ]
 
 
 def get_worktree_path(project_dir: Path, spec: TaskSpec, task: Task) -> Path:
@@ -178,30 +239,14 @@ def get_worktree_path(project_dir: Path, spec: TaskSpec, task: Task) -> Path:
     return worktree_base / task.id
 
 
-def list_worktrees(project_dir: Path) -> dict[str, str]:
-    """List git worktrees and their branches."""
+def read_spec_content(project_dir: Path, task: Task) -> Optional[str]:
+    """Read a task's spec_file, or None if unset or unreadable."""
+    if not task.spec_file:
+        return None
     try:
-        result = subprocess.run(
-            ["git", "worktree", "list", "--porcelain"],
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode != 0:
-            return {}
-
-        worktrees = {}
-        current_path = None
-        for line in result.stdout.splitlines():
-            if line.startswith("worktree "):
-                current_path = line[9:]
-            elif line.startswith("branch ") and current_path:
-                worktrees[current_path] = line[7:]
-                current_path = None
-
-        return worktrees
-    except Exception:
-        return {}
+        return (project_dir / task.spec_file).read_text()
+    except OSError:
+        return None
 
 
 def format_task_context(task: Task, worktree_path: Path, spec_content: Optional[str]) -> str:
@@ -223,8 +268,9 @@ def format_task_context(task: Task, worktree_path: Path, spec_content: Optional[
 
 def main() -> None:
     input_data = load_input()
-    project_dir = Path(input_data.get("project_dir", ".")).resolve()
-    spec_file = project_dir / ".claude" / "tasks.toml"
+    # abspath normalizes lexically; resolve() would stat every path component
+    project_dir = Path(os.path.abspath(input_data.get("project_dir", ".")))
+    spec_file = project_dir / ".claude/tasks.toml"
 
     # No spec file - request design phase
     if not spec_file.exists():
@@ -248,7 +294,7 @@ def main() -> None:
     # Parse and validate spec
     try:
         spec = parse_spec(spec_file)
-    except (tomllib.TOMLDecodeError, ValueError) as e:
+    except ValueError as e:  # includes tomllib.TOMLDecodeError
         block(f"Invalid tasks.toml: {e}")
 
     if spec.status != "ready_for_implementation":
@@ -264,14 +310,13 @@ def main() -> None:
         block(str(e))
 
     # Check completion
-    pending = [t for t in sorted_tasks if t.status == "pending"]
-    in_progress = [t for t in sorted_tasks if t.status == "in_progress"]
+    pending, in_progress, complete_ids = partition_tasks(sorted_tasks)
 
     if not pending and not in_progress:
         allow("All tasks complete.")
 
     # Find ready tasks
-    ready = get_ready_tasks(sorted_tasks)
+    ready = get_ready_tasks(pending, complete_ids)
 
     if not ready and not in_progress:
         block(
@@ -279,35 +324,15 @@ def main() -> None:
             f"Pending: {[t.id for t in pending]}"
         )
 
-    # Get worktree info
-    _worktrees = list_worktrees(project_dir)
-
-    # Build task contexts
-    task_contexts = []
-
-    for task in in_progress:
-        worktree_path = get_worktree_path(project_dir, spec, task)
-        spec_content = None
-        if task.spec_file:
-            spec_path = project_dir / task.spec_file
-            if spec_path.exists():
-                spec_content = spec_path.read_text()
-        task_contexts.append(("IN PROGRESS", format_task_context(task, worktree_path, spec_content)))
-
-    for task in ready:
-        worktree_path = get_worktree_path(project_dir, spec, task)
-        spec_content = None
-        if task.spec_file:
-            spec_path = project_dir / task.spec_file
-            if spec_path.exists():
-                spec_content = spec_path.read_text()
-        task_contexts.append(("READY", format_task_context(task, worktree_path, spec_content)))
-
-    # Format output
+    # Format output, joined once at the end
     output_parts = ["## Implementation Tasks\n"]
 
-    for status, context in task_contexts:
-        output_parts.append(f"**[{status}]**\n{context}\n")
+    for status, tasks in (("IN PROGRESS", in_progress), ("READY", ready)):
+        for task in tasks:
+            worktree_path = get_worktree_path(project_dir, spec, task)
+            spec_content = read_spec_content(project_dir, task)
+            context = format_task_context(task, worktree_path, spec_content)
+            output_parts.append(f"**[{status}]**\n{context}\n")
 
     output_parts.append(
         "\n## Workflow\n"
@@ -11,17 +11,24 @@ from pathlib import Path
 from typing import Any, Optional
 
 
+# Hook payloads are a few KB; anything past this is treated as malformed
+MAX_INPUT_BYTES = 1 << 20
+
+
 def load_input() -> dict[str, Any]:
-    """Load hook input from stdin."""
+    """Load hook input from stdin with a single bounded read."""
+    raw = sys.stdin.buffer.read(MAX_INPUT_BYTES + 1)
+    if len(raw) > MAX_INPUT_BYTES:
+        return {}
     try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
+        return json.loads(raw)
+    except ValueError:  # JSONDecodeError or undecodable bytes
         return {}
 
 
 def block(reason: str) -> None:
     """Output block decision and exit."""
-    print(json.dumps({"decision": "block", "reason": reason}))
+    print(json.dumps({"decision": "block", "reason": reason}, separators=(",", ":")))
     sys.exit(0)
 
 
@@ -37,7 +44,8 @@ def run_git(args: list[str], cwd: Path) -> tuple[bool, str]:
             ["git"] + args,
             cwd=cwd,
             capture_output=True,
-            text=True,
+            encoding="utf-8",
+            errors="replace",
         )
         return result.returncode == 0, result.stdout.strip()
     except Exception as e:
@@ -63,7 +71,7 @@ def get_worktree_branch(path: Path) -> Optional[str]:
 
 def get_main_branch(path: Path) -> str:
     """Determine the main branch name (main or master)."""
-    success, output = run_git(["rev-parse", "--verify", "refs/heads/main"], path)
+    success, _ = run_git(["show-ref", "--verify", "--quiet", "refs/heads/main"], path)
     if success:
         return "main"
     return "master"
@@ -11,17 +11,24 @@ from pathlib import Path
 from typing import Any
 
 
+# Hook payloads are a few KB; anything past this is treated as malformed
+MAX_INPUT_BYTES = 1 << 20
+
+
 def load_input() -> dict[str, Any]:
-    """Load hook input from stdin."""
+    """Load hook input from stdin with a single bounded read."""
+    raw = sys.stdin.buffer.read(MAX_INPUT_BYTES + 1)
+    if len(raw) > MAX_INPUT_BYTES:
+        return {}
     try:
-        return json.load(sys.stdin)
-    except json.JSONDecodeError:
+        return json.loads(raw)
+    except ValueError:  # JSONDecodeError or undecodable bytes
         return {}
 
 
 def block(reason: str) -> None:
     """Output block decision and exit."""
-    print(json.dumps({"decision": "block", "reason": reason}))
+    print(json.dumps({"decision": "block", "reason": reason}, separators=(",", ":")))
     sys.exit(0)
 
 
@@ -30,17 +37,23 @@ def allow() -> None:
     sys.exit(0)
 
 
-def run_verify(project_dir: Path, timeout: int = 300) -> tuple[bool, str]:
-    """Run make verify and return (success, output)."""
+def run_verify(
+    project_dir: Path, timeout: int = 300, max_output: int = 2000
+) -> tuple[bool, str]:
+    """Run make verify and return (success, output truncated to max_output bytes)."""
     try:
         result = subprocess.run(
             ["make", "verify"],
             cwd=project_dir,
             capture_output=True,
-            text=True,
             timeout=timeout,
         )
-        output = result.stdout + result.stderr
+        # Slice each stream first so chatty builds are never copied or decoded in full
+        stdout, stderr = result.stdout, result.stderr
+        raw = (stdout[:max_output] + stderr[:max_output])[:max_output]
+        output = raw.decode("utf-8", errors="replace")
+        if len(stdout) + len(stderr) > max_output:
+            output += "\n... (truncated)"
         return result.returncode == 0, output
     except subprocess.TimeoutExpired:
         return False, f"Verification timed out after {timeout}s"
@@ -71,11 +84,6 @@ def main() -> None:
     if success:
         allow()
     
-    # Truncate long output
-    max_len = 2000
-    if len(output) > max_len:
-        output = output[:max_len] + "\n... (truncated)"
-    
     block(
         f"Verification failed. Fix issues before completing:\n\n"
         f"```\n{output}\n```\n\n"
@@ -0,0 +1,18 @@
+"""Shared pytest configuration for swiss-cheese hook tests."""
+import sys
+from pathlib import Path
+
+import pytest
+
+# Hooks are standalone scripts, not a package; expose them for import once per session
+HOOKS_DIR = str(Path(__file__).parent.parent / "hooks")
+if HOOKS_DIR not in sys.path:
+    sys.path.insert(0, HOOKS_DIR)
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """Keep the tasks.toml parse cache out of the real user cache dir."""
+    path = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(path))
+    return path
@@ -1,22 +1,25 @@
 """Unit tests for swiss-cheese hooks."""
-import sys
-import tempfile
+import io
+import json
 from pathlib import Path
-from unittest.mock import patch
+from types import SimpleNamespace
 
 import pytest
 
-# Add hooks directory to path for imports
-sys.path.insert(0, str(Path(__file__).parent.parent / "hooks"))
-
 from session_start import (
+    MAX_INPUT_BYTES,
     Project,
     Task,
     TaskSpec,
+    cache_path_for,
+    load_toml_cached,
     parse_spec,
     topological_sort,
+    partition_tasks,
     get_ready_tasks,
     get_worktree_path,
+    load_input,
+    read_spec_content,
 )
 from subagent_stop import (
     is_worktree,
@@ -26,6 +29,30 @@ from subagent_stop import (
 )
 
 
+def _stdin(data: bytes) -> io.TextIOWrapper:
+    """Build a stand-in for sys.stdin holding raw bytes."""
+    return io.TextIOWrapper(io.BytesIO(data))
+
+
+class TestLoadInput:
+    """Test hook stdin parsing."""
+
+    def test_valid_json(self, monkeypatch):
+        """JSON object on stdin is returned as a dict."""
+        monkeypatch.setattr("sys.stdin", _stdin(b'{"project_dir": "/p"}'))
+        assert load_input() == {"project_dir": "/p"}
+
+    @pytest.mark.parametrize("payload", [
+        pytest.param(b"", id="empty"),
+        pytest.param(b"not json \xff", id="malformed"),
+        pytest.param(b'{"pad": "' + b"x" * MAX_INPUT_BYTES + b'"}', id="oversized"),
+    ])
+    def test_bad_input_returns_empty(self, monkeypatch, payload):
+        """Empty, malformed or oversized stdin yields an empty dict."""
+        monkeypatch.setattr("sys.stdin", _stdin(payload))
+        assert load_input() == {}
+
+
 class TestProject:
     """Test Project dataclass."""
 
@@ -69,77 +96,100 @@ class TestTask:
         assert t.deps == ["task-000"]
         assert t.spec_file == "specs/task.md"
 
-    def test_task_missing_id_fails(self):
-        """Task without id raises ValueError."""
-        with pytest.raises(ValueError, match="must have an id"):
-            Task(id="", title="Do thing", acceptance="Tests pass")
-
-    def test_task_missing_title_fails(self):
-        """Task without title raises ValueError."""
-        with pytest.raises(ValueError, match="must have a title"):
-            Task(id="task-001", title="", acceptance="Tests pass")
-
-    def test_task_missing_acceptance_fails(self):
-        """Task without acceptance raises ValueError."""
-        with pytest.raises(ValueError, match="must have acceptance"):
-            Task(id="task-001", title="Do thing", acceptance="")
+    @pytest.mark.parametrize("missing,match", [
+        ("id", "must have an id"),
+        ("title", "must have a title"),
+        ("acceptance", "must have acceptance"),
+    ])
+    def test_task_missing_field_fails(self, missing, match):
+        """Task without a required field raises ValueError."""
+        fields = {"id": "task-001", "title": "Do thing", "acceptance": "Tests pass"}
+        fields[missing] = ""
+        with pytest.raises(ValueError, match=match):
+            Task(**fields)
+
+    @pytest.mark.parametrize("status", ["pending", "in_progress", "complete"])
+    def test_valid_statuses(self, status):
+        """Every documented task status is accepted."""
+        t = Task(id="task-001", title="Do thing", acceptance="Tests pass", status=status)
+        assert t.status == status
 
     def test_task_invalid_status_fails(self):
         """Task with invalid status raises ValueError."""
         with pytest.raises(ValueError, match="invalid status"):
             Task(id="task-001", title="Do thing", acceptance="Tests pass", status="done")
 
+    def test_task_non_string_status_fails(self):
+        """Task with non-string status raises ValueError, not TypeError."""
+        with pytest.raises(ValueError, match="invalid status"):
+            Task(id="task-001", title="Do thing", acceptance="Tests pass", status=["done"])
+
+
+@pytest.fixture(scope="session")
+def make_spec():
+    """Factory building a valid TaskSpec, with any field overridable."""
+    def make(**overrides):
+        fields = {
+            "version": 1,
+            "status": "ready_for_implementation",
+            "project": Project(name="test"),
+            "tasks": [Task(id="task-001", title="Do thing", acceptance="Tests pass")],
+        }
+        fields.update(overrides)
+        return TaskSpec(**fields)
+    return make
+
 
 class TestTaskSpec:
     """Test TaskSpec dataclass validation."""
 
-    def test_valid_spec(self):
+    def test_valid_spec(self, make_spec):
         """Valid spec passes validation."""
-        project = Project(name="test")
-        tasks = [Task(id="task-001", title="Do thing", acceptance="Tests pass")]
-        spec = TaskSpec(version=1, status="ready_for_implementation", project=project, tasks=tasks)
+        spec = make_spec()
         assert spec.version == 1
 
-    def test_invalid_version_fails(self):
-        """Invalid version raises ValueError."""
-        project = Project(name="test")
-        tasks = [Task(id="task-001", title="Do thing", acceptance="Tests pass")]
-        with pytest.raises(ValueError, match="Unsupported spec version"):
-            TaskSpec(version=2, status="ready_for_implementation", project=project, tasks=tasks)
-
-    def test_invalid_status_fails(self):
-        """Invalid status raises ValueError."""
-        project = Project(name="test")
-        tasks = [Task(id="task-001", title="Do thing", acceptance="Tests pass")]
-        with pytest.raises(ValueError, match="Invalid spec status"):
-            TaskSpec(version=1, status="invalid", project=project, tasks=tasks)
-
-    def test_invalid_dep_reference_fails(self):
+    @pytest.mark.parametrize("status", ["draft", "needs_review", "ready_for_implementation"])
+    def test_valid_statuses(self, make_spec, status):
+        """Every documented spec status is accepted."""
+        assert make_spec(status=status).status == status
+
+    @pytest.mark.parametrize("overrides,match", [
+        ({"version": 2}, "Unsupported spec version"),
+        ({"status": "invalid"}, "Invalid spec status"),
+    ])
+    def test_invalid_header_fails(self, make_spec, overrides, match):
+        """Invalid version or status raises ValueError."""
+        with pytest.raises(ValueError, match=match):
+            make_spec(**overrides)
+
+    def test_invalid_dep_reference_fails(self, make_spec):
         """Task depending on nonexistent task raises ValueError."""
-        project = Project(name="test")
         tasks = [
             Task(id="task-001", title="Do thing", acceptance="Tests pass", deps=["task-999"])
         ]
         with pytest.raises(ValueError, match="depends on unknown task"):
-            TaskSpec(version=1, status="ready_for_implementation", project=project, tasks=tasks)
+            make_spec(tasks=tasks)
 
-    def test_valid_dep_reference(self):
+    def test_valid_dep_reference(self, make_spec):
         """Task depending on existing task passes."""
-        project = Project(name="test")
         tasks = [
             Task(id="task-001", title="First", acceptance="Tests pass"),
             Task(id="task-002", title="Second", acceptance="Tests pass", deps=["task-001"]),
         ]
-        spec = TaskSpec(version=1, status="ready_for_implementation", project=project, tasks=tasks)
+        spec = make_spec(tasks=tasks)
         assert len(spec.tasks) == 2
 
+    def test_duplicate_task_id_fails(self, make_spec):
+        """Two tasks sharing an id raise ValueError."""
+        tasks = [
+            Task(id="task-001", title="First", acceptance="Tests pass"),
+            Task(id="task-001", title="Second", acceptance="Tests pass"),
+        ]
+        with pytest.raises(ValueError, match="Duplicate task id: task-001"):
+            make_spec(tasks=tasks)
 
-class TestParseSpec:
-    """Test TOML parsing."""
 
-    def test_parse_valid_toml(self):
-        """Parse valid TOML file."""
-        toml_content = """
+FULL_SPEC_TOML = """
 version = 1
 status = "ready_for_implementation"
 
@@ -162,20 +212,8 @@ acceptance = "No warnings"
 deps = ["task-001"]
 status = "pending"
 """
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".toml", delete=False) as f:
-            f.write(toml_content)
-            f.flush()
-            spec = parse_spec(Path(f.name))
 
-        assert spec.project.name == "test-project"
-        assert spec.project.worktree_base == ".wt"
-        assert len(spec.tasks) == 2
-        assert spec.tasks[0].id == "task-001"
-        assert spec.tasks[1].deps == ["task-001"]
-
-    def test_parse_minimal_toml(self):
-        """Parse minimal valid TOML."""
-        toml_content = """
+MINIMAL_SPEC_TOML = """
 version = 1
 status = "draft"
 
@@ -187,35 +225,122 @@ id = "task-001"
 title = "Only task"
 acceptance = "Done"
 """
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".toml", delete=False) as f:
-            f.write(toml_content)
-            f.flush()
-            spec = parse_spec(Path(f.name))
+
+
+@pytest.fixture
+def write_toml(tmp_path):
+    """Write TOML content to a temporary tasks.toml and return its path."""
+    toml_path = tmp_path / "tasks.toml"
+
+    def write(content: str) -> Path:
+        toml_path.write_text(content)
+        return toml_path
+    return write
+
+
+class TestParseSpec:
+    """Test TOML parsing."""
+
+    def test_parse_valid_toml(self, write_toml):
+        """Parse valid TOML file."""
+        spec = parse_spec(write_toml(FULL_SPEC_TOML))
+
+        assert spec.project.name == "test-project"
+        assert spec.project.worktree_base == ".wt"
+        assert len(spec.tasks) == 2
+        assert spec.tasks[0].id == "task-001"
+        assert spec.tasks[1].deps == ["task-001"]
+
+    def test_parse_minimal_toml(self, write_toml):
+        """Parse minimal valid TOML."""
+        spec = parse_spec(write_toml(MINIMAL_SPEC_TOML))
 
         assert spec.project.name == "minimal"
         assert spec.project.worktree_base == ".worktrees"  # default
         assert len(spec.tasks) == 1
 
+    def test_parse_writes_cache(self, write_toml):
+        """Parsing writes a JSON cache keyed on mtime and size."""
+        toml_path = write_toml('version = 1\n[project]\nname = "cached"\n')
+        load_toml_cached(toml_path)
+
+        cache = json.loads(cache_path_for(toml_path).read_text())
+        st = toml_path.stat()
+        assert cache["key"] == [st.st_mtime_ns, st.st_size]
+        assert cache["data"]["project"]["name"] == "cached"
+
+    def test_unchanged_file_uses_cache(self, write_toml):
+        """Unchanged file is served from the cache without re-parsing."""
+        toml_path = write_toml('version = 1\n[project]\nname = "cached"\n')
+        load_toml_cached(toml_path)
+
+        cache_path = cache_path_for(toml_path)
+        cache = json.loads(cache_path.read_text())
+        cache["data"]["project"]["name"] = "from-cache"
+        cache_path.write_text(json.dumps(cache))
+
+        assert load_toml_cached(toml_path)["project"]["name"] == "from-cache"
+
+    def test_changed_file_invalidates_cache(self, write_toml):
+        """Modified file is re-parsed and the cache refreshed."""
+        toml_path = write_toml('version = 1\n[project]\nname = "old"\n')
+        load_toml_cached(toml_path)
+
+        write_toml('version = 1\n[project]\nname = "newer"\n')
+        assert load_toml_cached(toml_path)["project"]["name"] == "newer"
+
+    def test_corrupt_cache_ignored(self, write_toml):
+        """Unreadable cache falls back to parsing the TOML file."""
+        toml_path = write_toml('version = 1\n[project]\nname = "fresh"\n')
+        cache_path = cache_path_for(toml_path)
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_text("not json")
+
+        assert load_toml_cached(toml_path)["project"]["name"] == "fresh"
+
+    def test_cache_stays_out_of_project(self, write_toml, cache_home):
+        """Cache lives in the user cache dir, never next to tasks.toml."""
+        toml_path = write_toml(MINIMAL_SPEC_TOML)
+        load_toml_cached(toml_path)
+
+        assert [p.name for p in toml_path.parent.iterdir()] == ["tasks.toml"]
+        assert cache_path_for(toml_path).is_relative_to(cache_home)
+        assert cache_path_for(toml_path).exists()
+
+
+def _task(tid: str, status: str = "pending", deps: tuple[str, ...] = (), **fields) -> Task:
+    """Build a minimal Task, titled after its id, with any extra fields set."""
+    return Task(
+        id=tid, title=tid.upper(), acceptance="ok", status=status, deps=list(deps), **fields
+    )
+
 
 class TestTopologicalSort:
     """Test topological sorting of tasks."""
 
     def test_no_deps(self):
         """Tasks with no deps maintain order."""
+        tasks = [_task("a"), _task("b"), _task("c")]
+        sorted_tasks = topological_sort(tasks)
+        assert [t.id for t in sorted_tasks] == ["a", "b", "c"]
+
+    def test_independent_tasks_keep_file_order(self):
+        """A task listed as a dep early is not pulled ahead of earlier tasks."""
         tasks = [
-            Task(id="a", title="A", acceptance="ok"),
-            Task(id="b", title="B", acceptance="ok"),
-            Task(id="c", title="C", acceptance="ok"),
+            _task("x", deps=("z",)),
+            _task("y"),
+            _task("z"),
         ]
         sorted_tasks = topological_sort(tasks)
-        assert [t.id for t in sorted_tasks] == ["a", "b", "c"]
+        assert [t.id for t in sorted_tasks] == ["y", "z", "x"]
+        assert [t.id for t in get_ready_tasks(sorted_tasks)] == ["y", "z"]
 
     def test_linear_deps(self):
         """Linear dependency chain sorts correctly."""
         tasks = [
-            Task(id="c", title="C", acceptance="ok", deps=["b"]),
-            Task(id="a", title="A", acceptance="ok"),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
+            _task("c", deps=("b",)),
+            _task("a"),
+            _task("b", deps=("a",)),
         ]
         sorted_tasks = topological_sort(tasks)
         ids = [t.id for t in sorted_tasks]
@@ -225,10 +350,10 @@ class TestTopologicalSort:
     def test_diamond_deps(self):
         """Diamond dependency pattern sorts correctly."""
         tasks = [
-            Task(id="d", title="D", acceptance="ok", deps=["b", "c"]),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
-            Task(id="c", title="C", acceptance="ok", deps=["a"]),
-            Task(id="a", title="A", acceptance="ok"),
+            _task("d", deps=("b", "c")),
+            _task("b", deps=("a",)),
+            _task("c", deps=("a",)),
+            _task("a"),
         ]
         sorted_tasks = topological_sort(tasks)
         ids = [t.id for t in sorted_tasks]
@@ -237,222 +362,226 @@ class TestTopologicalSort:
         assert ids.index("b") < ids.index("d")
         assert ids.index("c") < ids.index("d")
 
-    def test_cycle_detected(self):
+    @pytest.mark.parametrize("deps", [
+        pytest.param({"a": ["b"], "b": ["a"]}, id="two-node"),
+        pytest.param({"a": ["a"]}, id="self"),
+        pytest.param({"a": ["c"], "b": ["a"], "c": ["b"]}, id="three-node"),
+    ])
+    def test_cycle_detected(self, deps):
         """Cycle in dependencies raises ValueError."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", deps=["b"]),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
-        ]
+        tasks = [_task(tid, deps=task_deps) for tid, task_deps in deps.items()]
         with pytest.raises(ValueError, match="cycle detected"):
             topological_sort(tasks)
 
-    def test_self_cycle_detected(self):
-        """Self-referencing dependency raises ValueError."""
+    @pytest.mark.parametrize("n", [10, 100, 1000])
+    def test_long_chain(self, n):
+        """Reversed chain sorts back into order and yields exactly the next link."""
         tasks = [
-            Task(id="a", title="A", acceptance="ok", deps=["a"]),
+            _task(f"t{i}", "complete" if i < n // 2 else "pending",
+                  (f"t{i - 1}",) if i else ())
+            for i in range(n)
         ]
-        with pytest.raises(ValueError, match="cycle detected"):
-            topological_sort(tasks)
-
-    def test_complex_cycle_detected(self):
-        """Complex cycle (a->b->c->a) raises ValueError."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", deps=["c"]),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
-            Task(id="c", title="C", acceptance="ok", deps=["b"]),
-        ]
-        with pytest.raises(ValueError, match="cycle detected"):
-            topological_sort(tasks)
+        sorted_tasks = topological_sort(list(reversed(tasks)))
+        assert [t.id for t in sorted_tasks] == [t.id for t in tasks]
+        assert [t.id for t in get_ready_tasks(sorted_tasks)] == [f"t{n // 2}"]
 
 
 class TestGetReadyTasks:
     """Test ready task selection."""
 
-    def test_no_deps_all_ready(self):
-        """Tasks with no deps are all ready."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok"),
-            Task(id="b", title="B", acceptance="ok"),
-        ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 2
-
-    def test_pending_with_complete_deps(self):
-        """Pending task with complete deps is ready."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", status="complete"),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
-        ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 1
-        assert ready[0].id == "b"
-
-    def test_pending_with_incomplete_deps(self):
-        """Pending task with incomplete deps is not ready."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", status="pending"),
-            Task(id="b", title="B", acceptance="ok", deps=["a"]),
-        ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 1
-        assert ready[0].id == "a"
-
-    def test_in_progress_not_ready(self):
-        """In-progress tasks are not in ready list."""
+    @pytest.mark.parametrize("tasks,expected", [
+        pytest.param([_task("a"), _task("b")], ["a", "b"], id="no-deps-all-ready"),
+        pytest.param(
+            [_task("a", "complete"), _task("b", deps=("a",))], ["b"],
+            id="pending-with-complete-deps",
+        ),
+        pytest.param(
+            [_task("a"), _task("b", deps=("a",))], ["a"],
+            id="pending-with-incomplete-deps",
+        ),
+        pytest.param(
+            [_task("a", "in_progress"), _task("b")], ["b"],
+            id="in-progress-not-ready",
+        ),
+        pytest.param(
+            [_task("a", "complete"), _task("b", "complete")], [],
+            id="complete-not-ready",
+        ),
+        pytest.param(
+            [_task("a", "complete"), _task("b", "complete"), _task("c", deps=("a", "b"))],
+            ["c"],
+            id="multiple-deps-all-complete",
+        ),
+        pytest.param(
+            [_task("a", "complete"), _task("b"), _task("c", deps=("a", "b"))],
+            ["b"],
+            id="multiple-deps-some-incomplete",
+        ),
+    ])
+    def test_ready_tasks(self, tasks, expected):
+        """Only pending tasks with all deps complete are ready, in input order."""
+        assert [t.id for t in get_ready_tasks(tasks)] == expected
+
+
+class TestPartitionTasks:
+    """Test single-pass status partitioning."""
+
+    def test_partition_by_status(self):
+        """Tasks are split into pending, in-progress and complete ids."""
         tasks = [
-            Task(id="a", title="A", acceptance="ok", status="in_progress"),
-            Task(id="b", title="B", acceptance="ok"),
+            _task("a", "complete"),
+            _task("b", "in_progress"),
+            _task("c"),
+            _task("d", "complete"),
         ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 1
-        assert ready[0].id == "b"
+        pending, in_progress, complete_ids = partition_tasks(tasks)
+        assert [t.id for t in pending] == ["c"]
+        assert [t.id for t in in_progress] == ["b"]
+        assert complete_ids == {"a", "d"}
 
-    def test_complete_not_ready(self):
-        """Complete tasks are not in ready list."""
+    def test_ready_from_partition(self):
+        """get_ready_tasks accepts precomputed complete ids."""
         tasks = [
-            Task(id="a", title="A", acceptance="ok", status="complete"),
-            Task(id="b", title="B", acceptance="ok", status="complete"),
+            _task("a", "complete"),
+            _task("b", deps=("a",)),
+            _task("c", deps=("b",)),
         ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 0
+        pending, _, complete_ids = partition_tasks(tasks)
+        ready = get_ready_tasks(pending, complete_ids)
+        assert [t.id for t in ready] == ["b"]
 
-    def test_multiple_deps_all_complete(self):
-        """Task with multiple deps ready when all complete."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", status="complete"),
-            Task(id="b", title="B", acceptance="ok", status="complete"),
-            Task(id="c", title="C", acceptance="ok", deps=["a", "b"]),
-        ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 1
-        assert ready[0].id == "c"
 
-    def test_multiple_deps_some_incomplete(self):
-        """Task with multiple deps not ready when some incomplete."""
-        tasks = [
-            Task(id="a", title="A", acceptance="ok", status="complete"),
-            Task(id="b", title="B", acceptance="ok", status="pending"),
-            Task(id="c", title="C", acceptance="ok", deps=["a", "b"]),
-        ]
-        ready = get_ready_tasks(tasks)
-        assert len(ready) == 1
-        assert ready[0].id == "b"
+@pytest.fixture(scope="class")
+def worktree_spec(make_spec):
+    """Read-only spec with one default and one custom-worktree task."""
+    return make_spec(
+        project=Project(name="test", worktree_base=".worktrees"),
+        tasks=[
+            _task("task-001"),
+            _task("task-002", worktree="custom/path"),
+        ],
+    )
 
 
 class TestGetWorktreePath:
     """Test worktree path generation."""
 
-    def test_default_worktree_path(self):
+    def test_default_worktree_path(self, worktree_spec):
         """Default path uses worktree_base/task_id."""
-        project = Project(name="test", worktree_base=".worktrees")
-        spec = TaskSpec(
-            version=1,
-            status="ready_for_implementation",
-            project=project,
-            tasks=[Task(id="task-001", title="T", acceptance="ok")],
-        )
-        task = spec.tasks[0]
-        path = get_worktree_path(Path("/project"), spec, task)
+        spec = worktree_spec
+        path = get_worktree_path(Path("/project"), spec, spec.tasks[0])
         assert path == Path("/project/.worktrees/task-001")
 
-    def test_custom_worktree_path(self):
+    def test_custom_worktree_path(self, worktree_spec):
         """Custom worktree path overrides default."""
-        project = Project(name="test")
-        task = Task(id="task-001", title="T", acceptance="ok", worktree="custom/path")
-        spec = TaskSpec(
-            version=1,
-            status="ready_for_implementation",
-            project=project,
-            tasks=[task],
-        )
-        path = get_worktree_path(Path("/project"), spec, task)
+        spec = worktree_spec
+        path = get_worktree_path(Path("/project"), spec, spec.tasks[1])
         assert path == Path("/project/custom/path")
 
 
+class TestReadSpecContent:
+    """Test task spec_file loading."""
+
+    def test_reads_spec_file(self, tmp_path):
+        """Existing spec_file is read relative to the project dir."""
+        (tmp_path / "spec.md").write_text("details")
+        task = _task("a", spec_file="spec.md")
+        assert read_spec_content(tmp_path, task) == "details"
+
+    def test_missing_spec_file(self, tmp_path):
+        """Missing spec_file yields None."""
+        task = _task("a", spec_file="missing.md")
+        assert read_spec_content(tmp_path, task) is None
+
+    def test_no_spec_file(self):
+        """Task without spec_file yields None."""
+        task = _task("a")
+        assert read_spec_content(Path("/project"), task) is None
+
+
 class TestSubagentStopHelpers:
     """Test subagent_stop.py helper functions."""
 
-    def test_is_worktree_file(self):
+    @pytest.fixture
+    def fake_git(self, monkeypatch):
+        """Replace subagent_stop.run_git with canned (success, output) responses."""
+        fake = SimpleNamespace(responses=[], calls=[])
+
+        def run_git(args, cwd):
+            fake.calls.append(args)
+            return fake.responses.pop(0)
+
+        monkeypatch.setattr("subagent_stop.run_git", run_git)
+        return fake
+
+    def test_is_worktree_file(self, tmp_path):
         """Worktree has .git as file."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            path = Path(tmpdir)
-            git_file = path / ".git"
-            git_file.write_text("gitdir: /main/repo/.git/worktrees/branch")
-            assert is_worktree(path) is True
+        (tmp_path / ".git").write_text("gitdir: /main/repo/.git/worktrees/branch")
+        assert is_worktree(tmp_path) is True
 
-    def test_is_worktree_directory(self):
+    def test_is_worktree_directory(self, tmp_path):
         """Main repo has .git as directory."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            path = Path(tmpdir)
-            git_dir = path / ".git"
-            git_dir.mkdir()
-            assert is_worktree(path) is False
+        (tmp_path / ".git").mkdir()
+        assert is_worktree(tmp_path) is False
 
-    def test_is_worktree_missing(self):
+    def test_is_worktree_missing(self, tmp_path):
         """No .git means not a worktree."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            path = Path(tmpdir)
-            assert is_worktree(path) is False
+        assert is_worktree(tmp_path) is False
 
-    @patch("subagent_stop.run_git")
-    def test_get_worktree_branch(self, mock_run):
+    def test_get_worktree_branch(self, fake_git):
         """Get branch name from worktree."""
-        mock_run.return_value = (True, "feature-branch")
+        fake_git.responses.append((True, "feature-branch"))
         branch = get_worktree_branch(Path("/some/path"))
         assert branch == "feature-branch"
-        mock_run.assert_called_once()
+        assert fake_git.calls == [["rev-parse", "--abbrev-ref", "HEAD"]]
 
-    @patch("subagent_stop.run_git")
-    def test_get_worktree_branch_detached(self, mock_run):
+    def test_get_worktree_branch_detached(self, fake_git):
         """Detached HEAD returns None."""
-        mock_run.return_value = (True, "HEAD")
+        fake_git.responses.append((True, "HEAD"))
         branch = get_worktree_branch(Path("/some/path"))
         assert branch is None
 
-    @patch("subagent_stop.run_git")
-    def test_get_main_branch_main(self, mock_run):
+    def test_get_main_branch_main(self, fake_git):
         """Detect main as default branch."""
-        mock_run.return_value = (True, "abc123")
+        fake_git.responses.append((True, ""))
         branch = get_main_branch(Path("/repo"))
         assert branch == "main"
+        assert fake_git.calls == [["show-ref", "--verify", "--quiet", "refs/heads/main"]]
 
-    @patch("subagent_stop.run_git")
-    def test_get_main_branch_master(self, mock_run):
+    def test_get_main_branch_master(self, fake_git):
         """Fall back to master if main doesn't exist."""
-        mock_run.return_value = (False, "")
+        fake_git.responses.append((False, ""))
         branch = get_main_branch(Path("/repo"))
         assert branch == "master"
+        assert fake_git.calls == [["show-ref", "--verify", "--quiet", "refs/heads/main"]]
 
-    @patch("subagent_stop.run_git")
-    def test_branch_in_linear_history_merged(self, mock_run):
+    def test_branch_in_linear_history_merged(self, fake_git):
         """Branch fully merged shows as in history."""
         # merge-base equals branch tip
-        mock_run.side_effect = [
+        fake_git.responses.extend([
             (True, "abc123"),  # merge-base
             (True, "abc123"),  # branch tip
-        ]
+        ])
         result = is_branch_in_linear_history(Path("/repo"), "feature", "main")
         assert result is True
 
-    @patch("subagent_stop.run_git")
-    def test_branch_in_linear_history_rebased(self, mock_run):
+    def test_branch_in_linear_history_rebased(self, fake_git):
         """Branch rebased (cherry-picked) shows as in history."""
-        mock_run.side_effect = [
+        fake_git.responses.extend([
             (True, "abc123"),  # merge-base
             (True, "def456"),  # branch tip (different)
             (True, ""),  # cherry - no unpicked commits
-        ]
+        ])
         result = is_branch_in_linear_history(Path("/repo"), "feature", "main")
         assert result is True
 
-    @patch("subagent_stop.run_git")
-    def test_branch_not_in_history(self, mock_run):
+    def test_branch_not_in_history(self, fake_git):
         """Branch with unpicked commits not in history."""
-        mock_run.side_effect = [
+        fake_git.responses.extend([
             (True, "abc123"),  # merge-base
             (True, "def456"),  # branch tip
             (True, "+ abc123 commit message"),  # cherry - has unpicked
-        ]
+        ])
         result = is_branch_in_linear_history(Path("/repo"), "feature", "main")
         assert result is False
 
@@ -460,32 +589,49 @@ class TestSubagentStopHelpers:
 class TestVerifyGate:
     """Test verify_gate.py functionality."""
 
-    def test_run_verify_success(self):
+    def test_run_verify_success(self, tmp_path):
         """Successful make verify returns True."""
         from verify_gate import run_verify
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            makefile = Path(tmpdir) / "Makefile"
-            makefile.write_text(".PHONY: verify\nverify:\n\t@echo 'OK'\n")
-            success, output = run_verify(Path(tmpdir))
-            assert success is True
-            assert "OK" in output
+        makefile = tmp_path / "Makefile"
+        makefile.write_text(".PHONY: verify\nverify:\n\t@echo 'OK'\n")
+        success, output = run_verify(tmp_path)
+        assert success is True
+        assert "OK" in output
 
-    def test_run_verify_failure(self):
+    def test_run_verify_failure(self, tmp_path):
         """Failed make verify returns False."""
         from verify_gate import run_verify
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            makefile = Path(tmpdir) / "Makefile"
-            makefile.write_text(".PHONY: verify\nverify:\n\t@exit 1\n")
-            success, output = run_verify(Path(tmpdir))
-            assert success is False
+        makefile = tmp_path / "Makefile"
+        makefile.write_text(".PHONY: verify\nverify:\n\t@exit 1\n")
+        success, output = run_verify(tmp_path)
+        assert success is False
+
+    def test_run_verify_truncates_output(self, tmp_path):
+        """Output beyond max_output bytes is truncated."""
+        from verify_gate import run_verify
+
+        makefile = tmp_path / "Makefile"
+        makefile.write_text(".PHONY: verify\nverify:\n\t@printf '%0100d' 0\n")
+        success, output = run_verify(tmp_path, max_output=10)
+        assert success is True
+        assert output == "0" * 10 + "\n... (truncated)"
+
+    def test_run_verify_truncates_combined_streams(self, tmp_path):
+        """Stdout is kept first and stderr fills the rest of max_output."""
+        from verify_gate import run_verify
+
+        makefile = tmp_path / "Makefile"
+        makefile.write_text(".PHONY: verify\nverify:\n\t@printf out; printf '%0100d' 0 >&2\n")
+        success, output = run_verify(tmp_path, max_output=10)
+        assert success is True
+        assert output == "out" + "0" * 7 + "\n... (truncated)"
 
-    def test_run_verify_no_make(self):
+    def test_run_verify_no_make(self, tmp_path):
         """Missing make returns False."""
         from verify_gate import run_verify
 
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # No Makefile
-            success, output = run_verify(Path(tmpdir))
-            assert success is False
+        # No Makefile
+        success, output = run_verify(tmp_path)
+        assert success is False